@@ -1,26 +1,30 @@
 from django.contrib import admin
+from .cache import invalidate_available_appointments
 from .models import Appointment, Booking
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
 
 
 @admin.register(Appointment)
 class AppointmentAdmin(admin.ModelAdmin):
     list_display = (
         'appointment_id', 'get_doctor_name', 'get_week_day_display', 
-        'start_time', 'get_end_time', 'duration', 'is_available', 'created_at'
+        'start_time', 'end_time', 'duration', 'is_available', 'created_at'
     )
     list_filter = ('week_day', 'is_available', 'doctor__speciality', 'created_at')
+    list_select_related = ('doctor__user',)
     search_fields = (
         'appointment_id', 'doctor__user__first_name', 'doctor__user__last_name',
         'doctor__user__email', 'doctor__speciality'
     )
-    readonly_fields = ('appointment_id', 'created_at', 'updated_at', 'get_end_time')
+    readonly_fields = ('appointment_id', 'created_at', 'updated_at', 'end_time')
     fieldsets = (
         ('Appointment Information', {
             'fields': ('appointment_id', 'doctor')
         }),
         ('Schedule', {
-            'fields': ('week_day', 'start_time', 'duration', 'get_end_time')
+            'fields': ('week_day', 'start_time', 'duration', 'end_time')
         }),
         ('Availability', {
             'fields': ('is_available',)
@@ -38,11 +42,6 @@ class AppointmentAdmin(admin.ModelAdmin):
     def get_week_day_display(self, obj):
         return obj.get_week_day_display()
     get_week_day_display.short_description = 'Day'
-    
-    def get_end_time(self, obj):
-        end_time = obj.get_end_time()
-        return end_time.strftime('%H:%M') if end_time else 'Not calculated'
-    get_end_time.short_description = 'End Time'
 
 
 @admin.register(Booking)
@@ -55,12 +54,14 @@ class BookingAdmin(admin.ModelAdmin):
         'is_canceled', 'created_at', 'updated_at',
         'appointment__week_day', 'appointment__doctor__speciality'
     )
+    list_select_related = ('patient__user', 'appointment__doctor__user')
     search_fields = (
         'booking_id', 'patient__user__first_name', 'patient__user__last_name',
         'patient__user__email', 'appointment__doctor__user__first_name',
         'appointment__doctor__user__last_name', 'reason'
     )
     readonly_fields = ('booking_id', 'created_at', 'updated_at', 'canceled_at')
+    raw_id_fields = ('appointment', 'patient')
     
     fieldsets = (
         ('Booking Information', {
@@ -81,9 +82,10 @@ class BookingAdmin(admin.ModelAdmin):
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
         if db_field.name == "appointment":
             # Only show appointments that don't have active bookings
+            active_bookings = Booking.objects.filter(appointment=OuterRef('pk'), is_canceled=False)
             kwargs["queryset"] = Appointment.objects.filter(
-                Q(bookings__isnull=True) | Q(bookings__is_canceled=True)
-            ).distinct()
+                ~Exists(active_bookings)
+            )
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
     def get_patient_name(self, obj):
@@ -111,10 +113,20 @@ class BookingAdmin(admin.ModelAdmin):
     booking_status.short_description = 'Status'
     
     def cancel_booking_action(self, request, queryset):
-        canceled_count = 0
-        for booking in queryset.filter(is_canceled=False):
-            booking.cancel_booking(reason="Canceled by admin")
-            canceled_count += 1
+        now = timezone.now()
+        active_bookings = queryset.filter(is_canceled=False)
+        with transaction.atomic():
+            appointment_ids = list(active_bookings.order_by().values_list('appointment_id', flat=True))
+            canceled_count = active_bookings.update(
+                is_canceled=True, canceled_at=now,
+                cancellation_reason="Canceled by admin", updated_at=now
+            )
+            # Free the slots that no longer have an active booking
+            Appointment.objects.filter(pk__in=appointment_ids).exclude(
+                bookings__is_canceled=False
+            ).update(is_available=True, updated_at=now)
+            # Bulk updates bypass the post_save signal
+            transaction.on_commit(invalidate_available_appointments)
         
         self.message_user(
             request, 
@@ -123,24 +135,3 @@ class BookingAdmin(admin.ModelAdmin):
     cancel_booking_action.short_description = "Cancel selected bookings"
     
     actions = [cancel_booking_action]
-
-    def save_model(self, request, obj, form, change):
-        is_new = not change
-        was_canceled = False
-        
-        if change:
-            try:
-                old_booking = Booking.objects.get(pk=obj.pk)
-                was_canceled = not old_booking.is_canceled and obj.is_canceled
-            except Booking.DoesNotExist:
-                is_new = True
-        
-        super().save_model(request, obj, form, change)
-        
-        try:
-            if is_new and not obj.is_canceled:
-                obj._create_booking_notification()
-            elif was_canceled and obj.is_canceled:
-                obj._create_cancellation_notification()
-        except Exception as e:
-            print(f"❌ Error in admin notification creation: {e}")
\ No newline at end of file
@@ -0,0 +1,26 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+AVAILABLE_APPOINTMENTS_VERSION_KEY = 'appointments:available:version'
+
+
+def available_appointments_cache_key(full_path):
+    """Build the cache key for an available-appointments listing request."""
+    version = cache.get(AVAILABLE_APPOINTMENTS_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(AVAILABLE_APPOINTMENTS_VERSION_KEY, version, None)
+    return f"appointments:available:{version}:{full_path}"
+
+
+def available_appointments_cache_timeout():
+    """Seconds to keep a listing; 0 means the listing is not cached."""
+    return settings.HEALTHCARE_SETTINGS.get('AVAILABLE_APPOINTMENTS_CACHE_TIMEOUT', 0)
+
+
+def invalidate_available_appointments():
+    """Retire every cached listing by moving to a fresh version."""
+    cache.set(AVAILABLE_APPOINTMENTS_VERSION_KEY, uuid.uuid4().hex, None)
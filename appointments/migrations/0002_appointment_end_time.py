@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-15 22:21
+
+from datetime import datetime, timedelta
+
+from django.db import migrations, models
+
+
+def populate_end_time(apps, schema_editor):
+    Appointment = apps.get_model('appointments', 'Appointment')
+    appointments = list(Appointment.objects.only('start_time', 'duration'))
+    for appointment in appointments:
+        start_datetime = datetime.combine(datetime.today(), appointment.start_time)
+        appointment.end_time = (start_datetime + timedelta(minutes=appointment.duration)).time()
+    Appointment.objects.bulk_update(appointments, ['end_time'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='end_time',
+            field=models.TimeField(editable=False, help_text='End time of the appointment slot, derived from start_time and duration', null=True),
+        ),
+        migrations.RunPython(populate_end_time, migrations.RunPython.noop),
+    ]
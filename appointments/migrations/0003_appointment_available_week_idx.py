@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-15 22:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0002_appointment_end_time'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['week_day', 'start_time'], name='appt_available_week_idx'),
+        ),
+    ]
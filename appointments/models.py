@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Exists, OuterRef
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
 from django.utils import timezone
@@ -6,6 +7,13 @@ from datetime import datetime, timedelta
 import uuid
 
 
+class AppointmentQuerySet(models.QuerySet):
+    def with_booking_state(self):
+        """Annotate has_active_booking so is_slot_available() needs no per-row query."""
+        active_bookings = Booking.objects.filter(appointment=OuterRef('pk'), is_canceled=False)
+        return self.annotate(has_active_booking=Exists(active_bookings))
+
+
 class Appointment(models.Model):
     """Model for medical appointment slots created by doctors."""
     
@@ -25,9 +33,12 @@ class Appointment(models.Model):
     week_day = models.IntegerField(choices=DAYS_OF_WEEK, help_text="Day of the week (1=Monday, 7=Sunday)")
     start_time = models.TimeField(help_text="Start time of the appointment slot")
     duration = models.IntegerField(default=60, help_text="Duration in minutes")
+    end_time = models.TimeField(null=True, editable=False, help_text="End time of the appointment slot, derived from start_time and duration")
     is_available = models.BooleanField(default=True, help_text="Whether this slot is available for booking")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = AppointmentQuerySet.as_manager()
     
     class Meta:
         constraints = [
@@ -40,10 +51,18 @@ class Appointment(models.Model):
                 name='unique_doctor_time_slot'
             )
         ]
+        indexes = [
+            # Patient listing: available slots in week order
+            models.Index(
+                fields=['week_day', 'start_time'],
+                condition=models.Q(is_available=True),
+                name='appt_available_week_idx'
+            ),
+        ]
         ordering = ['week_day', 'start_time']
     
     def __str__(self):
-        return f"Dr. {self.doctor.user.first_name} {self.doctor.user.last_name} - {self.get_week_day_display()} at {self.start_time}"
+        return f"Slot {self.appointment_id} - {self.get_week_day_display()} at {self.start_time}"
     
     def get_end_time(self):
         """Calculate end time based on start time and duration."""
@@ -53,9 +72,20 @@ class Appointment(models.Model):
         end_datetime = start_datetime + timedelta(minutes=self.duration)
         return end_datetime.time()
     
+    def save(self, *args, **kwargs):
+        self.end_time = self.get_end_time()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'start_time', 'duration'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'end_time'}
+        super().save(*args, **kwargs)
+    
     def is_slot_available(self):
         """Check if this appointment slot is available for booking."""
-        return self.is_available and not self.bookings.filter(is_canceled=False).exists()
+        if not self.is_available:
+            return False
+        if hasattr(self, 'has_active_booking'):
+            return not self.has_active_booking
+        return not self.bookings.filter(is_canceled=False).exists()
     
     def mark_as_booked(self):
         """Mark this appointment slot as unavailable."""
@@ -73,8 +103,7 @@ class Appointment(models.Model):
         
         # Validate that appointment is within doctor's working hours
         if hasattr(self, 'doctor') and self.doctor:
-            working_days = [int(day.strip()) for day in self.doctor.working_day.split(',') if day.strip()]
-            if self.week_day not in working_days:
+            if self.week_day not in self.doctor.working_days_set:
                 raise ValidationError(
                     f"Doctor is not available on {self.get_week_day_display()}. "
                     f"Working days: {self.doctor.get_working_days_display()}"
@@ -117,61 +146,48 @@ class Booking(models.Model):
     
     def __str__(self):
         status = "Canceled" if self.is_canceled else "Active"
-        return (f"Booking {self.booking_id} - "
-                f"Dr. {self.appointment.doctor.user.first_name} {self.appointment.doctor.user.last_name} - "
-                f"{self.appointment.get_week_day_display()} at {self.appointment.start_time} - "
-                f"Patient: {self.patient.user.first_name} {self.patient.user.last_name} - "
-                f"Status: {status}")
+        return f"Booking {self.booking_id} ({status})"
     
     def clean(self):
         super().clean()
-        if not self.appointment.is_slot_available() and not self.pk:
+        # booking_id has a default, so pk is set before the first save.
+        if not self._state.adding:
+            return
+
+        # is_slot_available() already fails whenever an active booking exists;
+        # a racing insert is caught by unique_active_booking_per_appointment.
+        if not self.appointment.is_slot_available():
             raise ValidationError("This appointment slot is no longer available.")
-        
-        if not self.pk:
-            existing_booking = Booking.objects.filter(
-                appointment=self.appointment,
-                appointment__week_day=self.appointment.week_day,
-                appointment__start_time=self.appointment.start_time,
-                is_canceled=False
-            ).first()
-            
-            if existing_booking:
-                raise ValidationError(
-                    f"This appointment slot is already booked by {existing_booking.patient.user.get_full_name()}."
-                )
 
     def save(self, *args, **kwargs):
-        is_new = self.pk is None
-        was_canceled = False
-        if not is_new and self.pk:
-            try:
-                old_booking = Booking.objects.get(pk=self.pk)
-                was_canceled = not old_booking.is_canceled and self.is_canceled
-            except Booking.DoesNotExist:
-                was_canceled = False
         if self.is_canceled and not self.canceled_at:
             self.canceled_at = timezone.now()
         elif not self.is_canceled:
             self.canceled_at = None
         
-        super().save(*args, **kwargs)
-
-        self.update_appointment_availability()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.update_appointment_availability()
     
     def update_appointment_availability(self):
-        active_bookings = self.appointment.bookings.filter(is_canceled=False).count()
-
-        if active_bookings > 0:
-            if self.appointment.is_available:
-                self.appointment.mark_as_booked()
-        else:
-            if not self.appointment.is_available:
-                self.appointment.mark_as_available()
+        """Recompute the slot's availability from its active bookings in a single UPDATE."""
+        active_bookings = Booking.objects.filter(appointment=OuterRef('pk'), is_canceled=False)
+        now = timezone.now()
+        Appointment.objects.filter(pk=self.appointment_id).update(
+            is_available=~Exists(active_bookings), updated_at=now
+        )
+        if Booking.appointment.is_cached(self):
+            if not self.is_canceled:
+                # An active booking always holds the slot
+                self.appointment.is_available = False
+                self.appointment.updated_at = now
+            else:
+                # Another booking may have taken the slot since this one was canceled
+                self.appointment.refresh_from_db(fields=['is_available', 'updated_at'])
     
     def cancel_booking(self, reason=None):
         self.is_canceled = True
         self.canceled_at = timezone.now()
         if reason:
             self.cancellation_reason = reason
-        self.save()
+        self.save(update_fields=['is_canceled', 'canceled_at', 'cancellation_reason', 'updated_at'])
@@ -1,15 +1,20 @@
 from rest_framework import serializers
 from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from .cache import invalidate_available_appointments
 from .models import Appointment, Booking
 from users.serializers import UserSerializer, DoctorProfileSerializer, PatientProfileSerializer
 from users.models import Doctor, Patient
 
 
+# Slot lengths a doctor may publish: 15-minute steps up to two hours
+VALID_DURATIONS = frozenset(range(15, 121, 15))
+
+
 class AppointmentSerializer(serializers.ModelSerializer):
     """Serializer for appointment slots created by doctors."""
     doctor_info = DoctorProfileSerializer(source='doctor', read_only=True)
     week_day_display = serializers.CharField(source='get_week_day_display', read_only=True)
-    end_time = serializers.SerializerMethodField()
     slot_status = serializers.SerializerMethodField()
     
     class Meta:
@@ -19,10 +24,7 @@ class AppointmentSerializer(serializers.ModelSerializer):
             'start_time', 'end_time', 'duration', 'is_available', 'slot_status',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['appointment_id', 'created_at', 'updated_at']
-    
-    def get_end_time(self, obj):
-        return obj.get_end_time()
+        read_only_fields = ['appointment_id', 'end_time', 'created_at', 'updated_at']
     
     def get_slot_status(self, obj):
         return "Available" if obj.is_slot_available() else "Booked"
@@ -32,7 +34,9 @@ class AppointmentSerializer(serializers.ModelSerializer):
         try:
             appointment.clean()
         except DjangoValidationError as e:
-            raise serializers.ValidationError(e.message_dict)
+            raise serializers.ValidationError(
+                e.message_dict if hasattr(e, 'error_dict') else e.messages
+            )
         return data
 
 
@@ -50,7 +54,9 @@ class AppointmentCreateSerializer(serializers.ModelSerializer):
         try:
             appointment.clean()
         except DjangoValidationError as e:
-            raise serializers.ValidationError(e.message_dict)
+            raise serializers.ValidationError(
+                e.message_dict if hasattr(e, 'error_dict') else e.messages
+            )
         return data
 
 
@@ -73,7 +79,13 @@ class BookingSerializer(serializers.ModelSerializer):
         ]
     
     def get_doctor_info(self, obj):
-        return DoctorProfileSerializer(obj.appointment.doctor).data
+        # A patient's bookings often share a doctor, so serialize each profile once
+        if not hasattr(self, '_doctor_info_cache'):
+            self._doctor_info_cache = {}
+        doctor_id = obj.appointment.doctor_id
+        if doctor_id not in self._doctor_info_cache:
+            self._doctor_info_cache[doctor_id] = DoctorProfileSerializer(obj.appointment.doctor).data
+        return self._doctor_info_cache[doctor_id]
     
     def get_booking_status(self, obj):
         if obj.is_canceled:
@@ -85,7 +97,9 @@ class BookingSerializer(serializers.ModelSerializer):
         try:
             booking.clean()
         except DjangoValidationError as e:
-            raise serializers.ValidationError(e.message_dict)
+            raise serializers.ValidationError(
+                e.message_dict if hasattr(e, 'error_dict') else e.messages
+            )
         return data
 
 
@@ -94,6 +108,7 @@ class BookingCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Booking
         fields = ['appointment', 'patient', 'reason']
+        read_only_fields = ['patient']
     
     def validate_appointment(self, value):
         if not value.is_slot_available():
@@ -101,20 +116,34 @@ class BookingCreateSerializer(serializers.ModelSerializer):
                 "This appointment slot is no longer available."
             )
         return value
-    
-    def validate_patient(self, value):
-        if not value:
-            raise serializers.ValidationError("Patient is required.")
-        return value
 
     def validate(self, data):
         booking = Booking(**data)
         try:
             booking.clean()
         except DjangoValidationError as e:
-            raise serializers.ValidationError(e.message_dict)
+            raise serializers.ValidationError(
+                e.message_dict if hasattr(e, 'error_dict') else e.messages
+            )
         return data
 
+    def create(self, validated_data):
+        with transaction.atomic():
+            # Lock the slot so concurrent bookings for it queue behind this one
+            appointment = Appointment.objects.select_for_update().only('is_available').get(
+                pk=validated_data['appointment'].pk
+            )
+            if not appointment.is_available:
+                # Raised outside is_valid(), so match its list-per-field shape
+                raise serializers.ValidationError({
+                    'appointment': ["This appointment slot is no longer available."]
+                })
+            return super().create(validated_data)
+
+    def to_representation(self, instance):
+        # Respond with the full booking so the view needs no second serializer
+        return BookingSerializer(instance, context=self.context).data
+
 
 class BookingCancelSerializer(serializers.Serializer):
     """Serializer for canceling bookings."""
@@ -132,7 +161,6 @@ class AvailableAppointmentSerializer(serializers.ModelSerializer):
     """Serializer for listing available appointment slots for booking."""
     doctor_info = serializers.SerializerMethodField()
     week_day_display = serializers.CharField(source='get_week_day_display', read_only=True)
-    end_time = serializers.SerializerMethodField()
     
     class Meta:
         model = Appointment
@@ -142,26 +170,75 @@ class AvailableAppointmentSerializer(serializers.ModelSerializer):
         ]
     
     def get_doctor_info(self, obj):
-        return {
-            'doctor_id': obj.doctor.user.user_id,
-            'name': f"Dr. {obj.doctor.user.get_full_name()}",
-            'speciality': obj.doctor.speciality,
-            'experience': obj.doctor.experience
-        }
-    
-    def get_end_time(self, obj):
-        return obj.get_end_time()
+        # Listings repeat the same few doctors across many slots, so build each payload once
+        if not hasattr(self, '_doctor_info_cache'):
+            self._doctor_info_cache = {}
+        if obj.doctor_id not in self._doctor_info_cache:
+            self._doctor_info_cache[obj.doctor_id] = {
+                'doctor_id': obj.doctor.user.user_id,
+                'name': f"Dr. {obj.doctor.user.get_full_name()}",
+                'speciality': obj.doctor.speciality,
+                'experience': obj.doctor.experience
+            }
+        return self._doctor_info_cache[obj.doctor_id]
+
+
+class DoctorAvailabilityListSerializer(serializers.ListSerializer):
+    """Insert a batch of published slots in one statement, skipping ones that already exist."""
+
+    def create(self, validated_data):
+        if not validated_data:
+            return []
+        # One lookup for the doctor's existing slots instead of letting the
+        # unique constraint abort the whole batch
+        taken = set(Appointment.objects.filter(
+            doctor=validated_data[0]['doctor'],
+            week_day__in={item['week_day'] for item in validated_data}
+        ).values_list('week_day', 'start_time'))
+        appointments = []
+        for item in validated_data:
+            slot = (item['week_day'], item['start_time'])
+            if slot not in taken:
+                taken.add(slot)
+                appointments.append(self.child.build(item))
+        with transaction.atomic():
+            Appointment.objects.bulk_create(appointments, batch_size=500)
+            # bulk_create() sends no post_save signals
+            transaction.on_commit(invalidate_available_appointments)
+        return appointments
 
 
 class DoctorAvailabilitySerializer(serializers.Serializer):
     """Serializer for managing doctor availability."""
+    appointment_id = serializers.UUIDField(read_only=True)
     week_day = serializers.IntegerField(min_value=1, max_value=7)
     start_time = serializers.TimeField()
+    end_time = serializers.TimeField(read_only=True)
     duration = serializers.IntegerField(min_value=15, max_value=120)
+    is_available = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        list_serializer_class = DoctorAvailabilityListSerializer
     
     def validate(self, data):
-        if data['duration'] % 15 != 0:
+        if data['duration'] not in VALID_DURATIONS:
             raise serializers.ValidationError(
                 "Duration must be in 15-minute intervals."
             )
-        return data
\ No newline at end of file
+        return data
+
+    def build(self, validated_data):
+        appointment = Appointment(is_available=True, **validated_data)
+        # bulk_create() skips save(), which derives end_time
+        appointment.end_time = appointment.get_end_time()
+        return appointment
+
+    def create(self, validated_data):
+        # Like the list path, publishing a slot that already exists is a no-op
+        appointment, _ = Appointment.objects.get_or_create(
+            doctor=validated_data['doctor'],
+            week_day=validated_data['week_day'],
+            start_time=validated_data['start_time'],
+            defaults={'duration': validated_data['duration'], 'is_available': True}
+        )
+        return appointment
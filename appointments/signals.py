@@ -0,0 +1,29 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_available_appointments
+from .models import Appointment, Booking
+from users.models import Doctor, User
+
+
+@receiver([post_save, post_delete], sender=Appointment)
+@receiver([post_save, post_delete], sender=Booking)
+def clear_available_appointments_cache(sender, **kwargs):
+    # Wait for the surrounding transaction so a concurrent request cannot
+    # cache the pre-commit state under the new version
+    transaction.on_commit(invalidate_available_appointments)
+
+
+@receiver([post_save, post_delete], sender=Doctor)
+def clear_available_appointments_cache_for_doctor(sender, **kwargs):
+    # Listings embed the doctor's speciality and experience
+    transaction.on_commit(invalidate_available_appointments)
+
+
+@receiver(post_save, sender=User)
+def clear_available_appointments_cache_for_doctor_user(sender, instance, update_fields=None, **kwargs):
+    # Listings embed the doctor's name; logins only touch last_login
+    if instance.role != User.DOCTOR or update_fields == frozenset({'last_login'}):
+        return
+    transaction.on_commit(invalidate_available_appointments)
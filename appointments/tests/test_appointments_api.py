@@ -1,13 +1,19 @@
 from datetime import date, time
 import json
+from unittest import mock
 
+from django.conf import settings
+from django.core.cache import cache
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from users.models import User, Doctor, Patient
+from appointments.cache import AVAILABLE_APPOINTMENTS_VERSION_KEY
 from appointments.models import Appointment, Booking
+from appointments.serializers import BookingCreateSerializer
 
 
 def _as_dict(item):
@@ -21,21 +27,24 @@ def _as_dict(item):
     return {}
 
 
-class AppointmentAndBookingFlowTests(APITestCase):
-    def setUp(self):
-        # ensure a clean state for appointments/bookings to avoid interference
-        Appointment.objects.all().delete()
-        Booking.objects.all().delete()
+# The listing cache is off unless a shared cache backend is configured
+LISTING_CACHE_ENABLED = override_settings(
+    HEALTHCARE_SETTINGS={**settings.HEALTHCARE_SETTINGS, 'AVAILABLE_APPOINTMENTS_CACHE_TIMEOUT': 60}
+)
 
-        self.doctor_user = User.objects.create_user(
+
+class AppointmentAndBookingFlowTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor_user = User.objects.create_user(
             email="dr.house@example.com",
             password="Str0ngPass!123",
             first_name="Gregory",
             last_name="House",
             role=User.DOCTOR,
         )
-        self.doctor_profile = Doctor.objects.create(
-            user=self.doctor_user,
+        cls.doctor_profile = Doctor.objects.create(
+            user=cls.doctor_user,
             speciality="General",
             dob=date(1970, 6, 11),
             experience=20,
@@ -46,15 +55,15 @@ class AppointmentAndBookingFlowTests(APITestCase):
             is_available=True,
         )
 
-        self.patient_user = User.objects.create_user(
+        cls.patient_user = User.objects.create_user(
             email="patient@example.com",
             password="Str0ngPass!123",
             first_name="Jane",
             last_name="Doe",
             role=User.PATIENT,
         )
-        self.patient_profile = Patient.objects.create(
-            user=self.patient_user,
+        cls.patient_profile = Patient.objects.create(
+            user=cls.patient_user,
             phone="0400000004",
             dob=date(1990, 7, 7),
             address1="7 Clinic Way",
@@ -65,14 +74,19 @@ class AppointmentAndBookingFlowTests(APITestCase):
             identity_id="ID-40001",
         )
 
-        self.doctor_token = RefreshToken.for_user(self.doctor_user).access_token
-        self.patient_token = RefreshToken.for_user(self.patient_user).access_token
+        # Sign once per class and keep the header string; setUpTestData
+        # attributes are deep-copied on first access in every test.
+        cls.doctor_auth = f'Bearer {RefreshToken.for_user(cls.doctor_user).access_token}'
+        cls.patient_auth = f'Bearer {RefreshToken.for_user(cls.patient_user).access_token}'
 
-    def authenticate(self, token):
-        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    def setUp(self):
+        cache.clear()
+
+    def authenticate(self, auth_header):
+        self.client.credentials(HTTP_AUTHORIZATION=auth_header)
 
     def test_doctor_can_publish_availability(self):
-        self.authenticate(self.doctor_token)
+        self.authenticate(self.doctor_auth)
         url = reverse('appointments:doctor-availability')
         payload = {
             "week_day": 1,
@@ -90,8 +104,63 @@ class AppointmentAndBookingFlowTests(APITestCase):
             ).exists()
         )
 
+    def test_doctor_can_publish_several_slots_at_once(self):
+        self.authenticate(self.doctor_auth)
+        url = reverse('appointments:doctor-availability')
+        payload = [
+            {"week_day": 1, "start_time": "09:00", "duration": 30},
+            {"week_day": 1, "start_time": "09:30", "duration": 30},
+            {"week_day": 3, "start_time": "14:00", "duration": 60},
+        ]
+        response = self.client.post(url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(response.data[1]["end_time"], "10:00:00")
+        self.assertEqual(
+            Appointment.objects.filter(doctor=self.doctor_profile).count(), 3
+        )
+
+    def test_publishing_slots_skips_ones_that_already_exist(self):
+        Appointment.objects.create(
+            doctor=self.doctor_profile,
+            week_day=1,
+            start_time=time(9, 0),
+            duration=30,
+        )
+        self.authenticate(self.doctor_auth)
+        url = reverse('appointments:doctor-availability')
+        payload = [
+            {"week_day": 1, "start_time": "09:00", "duration": 30},
+            {"week_day": 1, "start_time": "09:30", "duration": 30},
+            {"week_day": 1, "start_time": "09:30", "duration": 30},
+        ]
+        response = self.client.post(url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["start_time"], "09:30:00")
+        self.assertEqual(
+            Appointment.objects.filter(doctor=self.doctor_profile).count(), 2
+        )
+
+    def test_publishing_a_single_existing_slot_returns_it(self):
+        existing = Appointment.objects.create(
+            doctor=self.doctor_profile,
+            week_day=2,
+            start_time=time(9, 0),
+            duration=30,
+        )
+        self.authenticate(self.doctor_auth)
+        url = reverse('appointments:doctor-availability')
+        payload = {"week_day": 2, "start_time": "09:00", "duration": 30}
+        response = self.client.post(url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["appointment_id"], str(existing.appointment_id))
+        self.assertEqual(
+            Appointment.objects.filter(doctor=self.doctor_profile).count(), 1
+        )
+
     def test_patient_cannot_publish_availability(self):
-        self.authenticate(self.patient_token)
+        self.authenticate(self.patient_auth)
         url = reverse('appointments:doctor-availability')
         payload = {
             "week_day": 1,
@@ -128,7 +197,7 @@ class AppointmentAndBookingFlowTests(APITestCase):
             duration=60,
             is_available=True,
         )
-        self.authenticate(self.patient_token)
+        self.authenticate(self.patient_auth)
         url = reverse('appointments:booking-list-create')
         payload = {
             "appointment": str(appointment.appointment_id),
@@ -136,11 +205,32 @@ class AppointmentAndBookingFlowTests(APITestCase):
         }
         response = self.client.post(url, payload, format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn("booking_id", response.data)
+        self.assertIn("doctor_info", response.data)
         booking = Booking.objects.get(appointment=appointment)
         self.assertFalse(booking.is_canceled)
         appointment.refresh_from_db()
         self.assertFalse(appointment.is_available)
 
+    def test_booking_patient_is_taken_from_the_token(self):
+        appointment = Appointment.objects.create(
+            doctor=self.doctor_profile,
+            week_day=2,
+            start_time=time(10, 0),
+            duration=60,
+            is_available=True,
+        )
+        self.authenticate(self.patient_auth)
+        url = reverse('appointments:booking-list-create')
+        payload = {
+            "appointment": str(appointment.appointment_id),
+            "patient": str(self.doctor_user.user_id),
+        }
+        response = self.client.post(url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        booking = Booking.objects.get(appointment=appointment)
+        self.assertEqual(booking.patient, self.patient_profile)
+
     def test_double_booking_is_prevented(self):
         appointment = Appointment.objects.create(
             doctor=self.doctor_profile,
@@ -155,7 +245,7 @@ class AppointmentAndBookingFlowTests(APITestCase):
             reason="Existing booking"
         )
         appointment.mark_as_booked()
-        self.authenticate(self.patient_token)
+        self.authenticate(self.patient_auth)
         url = reverse('appointments:booking-list-create')
         payload = {
             "appointment": str(appointment.appointment_id),
@@ -163,13 +253,51 @@ class AppointmentAndBookingFlowTests(APITestCase):
         }
         response = self.client.post(url, payload, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        # backend may return structured errors under different shapes; accept either direct key
-        if "appointment" not in response.data:
-            err = response.data.get("error") or ""
-            self.assertTrue(
-                "appointment" in str(err) or "no longer available" in str(err).lower(),
-                msg=f"Unexpected error payload: {response.data}"
-            )
+        self.assertEqual(
+            response.data,
+            {"appointment": ["This appointment slot is no longer available."]}
+        )
+
+    def test_slot_taken_after_validation_is_rejected_under_the_lock(self):
+        appointment = Appointment.objects.create(
+            doctor=self.doctor_profile,
+            week_day=3,
+            start_time=time(15, 0),
+            duration=60,
+        )
+
+        def taken_by_a_concurrent_request(serializer, value):
+            # Another booking commits between validation and create()
+            Appointment.objects.filter(pk=value.pk).update(is_available=False)
+            return value
+
+        self.authenticate(self.patient_auth)
+        url = reverse('appointments:booking-list-create')
+        payload = {"appointment": str(appointment.appointment_id)}
+        with mock.patch.object(
+            BookingCreateSerializer, 'validate_appointment',
+            autospec=True, side_effect=taken_by_a_concurrent_request
+        ):
+            response = self.client.post(url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data,
+            {"appointment": ["This appointment slot is no longer available."]}
+        )
+        self.assertFalse(Booking.objects.filter(appointment=appointment).exists())
+
+    def test_slot_outside_working_days_is_a_validation_error(self):
+        self.authenticate(self.doctor_auth)
+        url = reverse('appointments:appointment-list-create')
+        payload = {
+            "doctor": str(self.doctor_user.user_id),
+            "week_day": 6,
+            "start_time": "10:00",
+            "duration": 60
+        }
+        response = self.client.post(url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Doctor is not available on Saturday", response.data["non_field_errors"][0])
 
     def test_patient_can_cancel_booking(self):
         appointment = Appointment.objects.create(
@@ -184,7 +312,7 @@ class AppointmentAndBookingFlowTests(APITestCase):
             patient=self.patient_profile,
             reason="Needs cancellation"
         )
-        self.authenticate(self.patient_token)
+        self.authenticate(self.patient_auth)
         url = reverse('appointments:booking-cancel', args=[booking.booking_id])
         response = self.client.post(url, {"cancellation_reason": "Feeling better"}, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -193,3 +321,138 @@ class AppointmentAndBookingFlowTests(APITestCase):
         self.assertTrue(booking.is_canceled)
         self.assertTrue(appointment.is_available)
         self.assertIsNotNone(booking.canceled_at)
+
+    def test_saving_a_canceled_booking_keeps_the_slot_held_by_a_newer_one(self):
+        appointment = Appointment.objects.create(
+            doctor=self.doctor_profile,
+            week_day=4,
+            start_time=time(16, 0),
+            duration=60,
+        )
+        canceled = Booking.objects.create(
+            appointment=appointment,
+            patient=self.patient_profile,
+            reason="First visit"
+        )
+        canceled.cancel_booking()
+        Booking.objects.create(
+            appointment=appointment,
+            patient=self.patient_profile,
+            reason="Rebooked"
+        )
+
+        canceled = Booking.objects.select_related('appointment').get(pk=canceled.pk)
+        canceled.reason = "First visit (edited)"
+        canceled.save()
+
+        self.assertFalse(canceled.appointment.is_available)
+        appointment.refresh_from_db()
+        self.assertFalse(appointment.is_available)
+
+    def test_slot_end_time_is_stored_on_save(self):
+        appointment = Appointment.objects.create(
+            doctor=self.doctor_profile,
+            week_day=5,
+            start_time=time(16, 30),
+            duration=45,
+        )
+        self.assertEqual(
+            Appointment.objects.values_list('end_time', flat=True).get(pk=appointment.pk),
+            time(17, 15)
+        )
+
+    @LISTING_CACHE_ENABLED
+    def test_available_listing_is_cached_until_a_booking_is_made(self):
+        appointment = Appointment.objects.create(
+            doctor=self.doctor_profile,
+            week_day=1,
+            start_time=time(11, 0),
+            duration=60,
+        )
+        self.authenticate(self.patient_auth)
+        url = reverse('appointments:available-appointments')
+        response = self.client.get(url)
+        self.assertEqual(response.data['count'], 1)
+
+        # Only the JWT user lookup hits the database on a warm cache
+        with self.assertNumQueries(1):
+            cached = self.client.get(url)
+        self.assertEqual(cached.data, response.data)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(appointment=appointment, patient=self.patient_profile)
+        response = self.client.get(url)
+        self.assertEqual(response.data['count'], 0)
+
+    @LISTING_CACHE_ENABLED
+    def test_available_listing_is_refreshed_when_the_doctor_changes(self):
+        Appointment.objects.create(
+            doctor=self.doctor_profile,
+            week_day=4,
+            start_time=time(10, 0),
+            duration=60,
+        )
+        self.authenticate(self.patient_auth)
+        url = reverse('appointments:available-appointments')
+        response = self.client.get(url)
+        self.assertEqual(response.data['results'][0]['doctor_info']['speciality'], "General")
+
+        self.doctor_profile.speciality = "Mental"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.doctor_profile.save()
+        response = self.client.get(url)
+        self.assertEqual(response.data['results'][0]['doctor_info']['speciality'], "Mental")
+
+        self.doctor_user.last_name = "Wilson"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.doctor_user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.data['results'][0]['doctor_info']['name'], "Dr. Gregory Wilson")
+
+    def test_available_listing_is_not_cached_by_default(self):
+        self.authenticate(self.patient_auth)
+        url = reverse('appointments:available-appointments')
+        self.client.get(url)
+        self.assertIsNone(cache.get(AVAILABLE_APPOINTMENTS_VERSION_KEY))
+
+    def test_admin_cancel_action_cancels_bookings_and_frees_slots(self):
+        appointment = Appointment.objects.create(
+            doctor=self.doctor_profile,
+            week_day=5,
+            start_time=time(9, 0),
+            duration=60,
+        )
+        booking = Booking.objects.create(appointment=appointment, patient=self.patient_profile)
+        admin_user = User.objects.create_superuser(email="admin@example.com", password="Str0ngPass!123")
+        self.client.force_login(admin_user)
+        cache.set(AVAILABLE_APPOINTMENTS_VERSION_KEY, 'before-cancel', None)
+
+        url = reverse('admin:appointments_booking_changelist')
+        payload = {'action': 'cancel_booking_action', '_selected_action': [str(booking.pk)]}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, payload)
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+
+        booking.refresh_from_db()
+        self.assertTrue(booking.is_canceled)
+        self.assertIsNotNone(booking.canceled_at)
+        self.assertEqual(booking.cancellation_reason, "Canceled by admin")
+        appointment.refresh_from_db()
+        self.assertTrue(appointment.is_available)
+        self.assertNotEqual(cache.get(AVAILABLE_APPOINTMENTS_VERSION_KEY), 'before-cancel')
+
+    def test_available_listing_ignores_a_malformed_doctor_id(self):
+        Appointment.objects.create(
+            doctor=self.doctor_profile,
+            week_day=2,
+            start_time=time(15, 0),
+            duration=60,
+        )
+        self.authenticate(self.patient_auth)
+        url = reverse('appointments:available-appointments')
+        response = self.client.get(url, {'doctor_id': 'not-a-uuid'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 0)
+
+        response = self.client.get(url, {'doctor_id': str(self.doctor_user.user_id)})
+        self.assertEqual(response.data['count'], 1)
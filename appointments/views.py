@@ -1,9 +1,14 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.core.cache import cache
+from django.db import IntegrityError
 from django.shortcuts import get_object_or_404
 from datetime import datetime, timedelta
+import logging
+import uuid
 
+from .cache import available_appointments_cache_key, available_appointments_cache_timeout
 from .models import Appointment, Booking
 from .serializers import (
     AppointmentSerializer, AppointmentCreateSerializer,
@@ -13,6 +18,8 @@ from .serializers import (
 from users.permissions import IsPatient, IsDoctor, IsSelf
 from users.models import Patient
 
+logger = logging.getLogger(__name__)
+
 
 # Doctor appointment slot management
 class AppointmentListCreateView(generics.ListCreateAPIView):
@@ -24,7 +31,9 @@ class AppointmentListCreateView(generics.ListCreateAPIView):
         return AppointmentSerializer
     
     def get_queryset(self):
-        return Appointment.objects.filter(doctor__user=self.request.user)
+        return Appointment.objects.filter(
+            doctor__user=self.request.user
+        ).select_related('doctor__user').with_booking_state()
 
 class AppointmentDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsDoctor]
@@ -32,25 +41,52 @@ class AppointmentDetailView(generics.RetrieveUpdateDestroyAPIView):
     lookup_field = 'appointment_id'
     
     def get_queryset(self):
-        return Appointment.objects.filter(doctor__user=self.request.user)
+        return Appointment.objects.filter(
+            doctor__user=self.request.user
+        ).select_related('doctor__user').with_booking_state()
 
 # Patient appointment discovery  
+# Columns read by AvailableAppointmentSerializer
+AVAILABLE_APPOINTMENT_FIELDS = (
+    'appointment_id', 'week_day', 'start_time', 'end_time', 'duration', 'doctor',
+    'doctor__speciality', 'doctor__experience',
+    'doctor__user__user_id', 'doctor__user__first_name', 'doctor__user__last_name',
+)
+
+
 class AvailableAppointmentListView(generics.ListAPIView):
     permission_classes = [IsPatient]
     serializer_class = AvailableAppointmentSerializer
     
     def get_queryset(self):
-        queryset = Appointment.objects.filter(is_available=True).select_related('doctor__user').order_by('week_day', 'start_time')
+        queryset = Appointment.objects.filter(is_available=True).select_related(
+            'doctor__user'
+        ).only(*AVAILABLE_APPOINTMENT_FIELDS).order_by('week_day', 'start_time')
 
         doctor_id = self.request.query_params.get('doctor_id')
         if doctor_id:
             try:
-                # Filter appointments for the specific doctor
-                queryset = queryset.filter(doctor__user__user_id=doctor_id)
-            except Exception as e:
+                doctor_id = uuid.UUID(doctor_id)
+            except ValueError:
                 return Appointment.objects.none()
+            # Filter appointments for the specific doctor
+            queryset = queryset.filter(doctor__user__user_id=doctor_id)
 
         return queryset
+
+    def list(self, request, *args, **kwargs):
+        timeout = available_appointments_cache_timeout()
+        if not timeout:
+            return super().list(request, *args, **kwargs)
+
+        cache_key = available_appointments_cache_key(request.get_full_path())
+        data = cache.get(cache_key)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        cache.set(cache_key, response.data, timeout)
+        return response
     
 class AvailableAppointmentDetailView(generics.RetrieveAPIView):
     """View for patients to see details of available appointment slots."""
@@ -59,7 +95,9 @@ class AvailableAppointmentDetailView(generics.RetrieveAPIView):
     lookup_field = 'appointment_id'
     
     def get_queryset(self):
-        return Appointment.objects.filter(is_available=True)
+        return Appointment.objects.filter(is_available=True).select_related(
+            'doctor__user'
+        ).only(*AVAILABLE_APPOINTMENT_FIELDS)
 
 # Booking management
 class BookingListCreateView(generics.ListCreateAPIView):
@@ -73,39 +111,29 @@ class BookingListCreateView(generics.ListCreateAPIView):
     def create(self, request, *args, **kwargs):
         try:
             # Get the patient from the current user
-            patient = Patient.objects.get(user=request.user)
-            
-            # Add patient to the data
-            data = request.data.copy()
-            data['patient'] = patient.user.user_id  # ✅ Use the Patient's User ID
-            
-            print(f"🔍 DEBUG: Creating booking with data: {data}")  # Debug log
-            
-            serializer = self.get_serializer(data=data)
-            serializer.is_valid(raise_exception=True)
-            booking = serializer.save()
-            
-            print(f"✅ DEBUG: Booking created: {booking.booking_id}")  # Debug log
-            
-            return Response(
-                BookingSerializer(booking).data,
-                status=status.HTTP_201_CREATED
-            )
+            patient = request.user.patient
         except Patient.DoesNotExist:
-            print(f"❌ DEBUG: Patient not found for user: {request.user.user_id}")  # Debug log
+            logger.debug("Patient not found for user: %s", request.user.user_id)
             return Response(
                 {'error': 'Patient profile not found'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        except Exception as e:
-            print(f"❌ DEBUG: Booking creation error: {str(e)}")  # Debug log
-            return Response(
-                {'error': str(e)},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        
+        logger.debug("Creating booking with data: %s", request.data)
+        
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # The patient always comes from the token, never from the request body
+        booking = serializer.save(patient=patient)
+        
+        logger.debug("Booking created: %s", booking.booking_id)
+        
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def get_queryset(self):
-        return Booking.objects.filter(patient__user=self.request.user)
+        return Booking.objects.filter(
+            patient__user=self.request.user
+        ).select_related('appointment__doctor__user', 'patient__user')
 
 class BookingDetailView(generics.RetrieveAPIView):
     permission_classes = [IsPatient]
@@ -113,14 +141,16 @@ class BookingDetailView(generics.RetrieveAPIView):
     lookup_field = 'booking_id'
     
     def get_queryset(self):
-        return Booking.objects.filter(patient__user=self.request.user)
+        return Booking.objects.filter(
+            patient__user=self.request.user
+        ).select_related('appointment__doctor__user', 'patient__user')
 
 class BookingCancelView(APIView):
     permission_classes = [IsPatient]
     
     def post(self, request, booking_id):
         booking = get_object_or_404(
-            Booking, 
+            Booking.objects.select_related('appointment__doctor__user', 'patient__user'),
             booking_id=booking_id, 
             patient__user=request.user,
             is_canceled=False
@@ -142,7 +172,7 @@ class MyAppointmentsView(generics.ListAPIView):
             doctor__user=self.request.user
         ).select_related(
             'doctor__user'
-        ).order_by('week_day', 'start_time')
+        ).with_booking_state().order_by('week_day', 'start_time')
         
         return queryset
 
@@ -152,22 +182,22 @@ class MyBookingsView(generics.ListAPIView):
     serializer_class = BookingSerializer
     
     def get_queryset(self):
-        return Booking.objects.filter(patient__user=self.request.user)
+        return Booking.objects.filter(
+            patient__user=self.request.user
+        ).select_related('appointment__doctor__user', 'patient__user')
 
 # Doctor availability management
-class DoctorScheduleView(APIView):
-    permission_classes = [IsDoctor]
-    
-    def get(self, request):
-        appointments = Appointment.objects.filter(doctor__user=request.user)
-        serializer = AppointmentSerializer(appointments, many=True)
-        return Response(serializer.data)
+class DoctorScheduleView(MyAppointmentsView):
+    """The doctor's full weekly schedule as a plain, unpaginated list."""
+    pagination_class = None
 
 class DoctorAvailabilityView(APIView):
+    """Publish one slot, or a list of slots in a single request."""
     permission_classes = [IsDoctor]
     
     def post(self, request):
-        serializer = DoctorAvailabilitySerializer(data=request.data)
+        many = isinstance(request.data, list)
+        serializer = DoctorAvailabilitySerializer(data=request.data, many=many)
         if serializer.is_valid():
             # Get the doctor
             try:
@@ -178,26 +208,13 @@ class DoctorAvailabilityView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Extract validated data
-            week_day = serializer.validated_data['week_day']
-            start_time = serializer.validated_data['start_time']
-            duration = serializer.validated_data.get('duration', 60)
-            
             try:
-                appointment = Appointment.objects.create(
-                    doctor=doctor,
-                    week_day=week_day,
-                    start_time=start_time,
-                    duration=duration,
-                    is_available=True
-                )
-                # Return created appointment
-                response_data = AppointmentSerializer(appointment).data
-                return Response(response_data, status=status.HTTP_201_CREATED)
-                
-            except Exception as e:
+                serializer.save(doctor=doctor)
+            except IntegrityError:
+                # Only reachable when another request publishes the same slot mid-batch
                 return Response(
-                    {"detail": f"Failed to create appointment: {str(e)}"}, 
-                    status=status.HTTP_400_BAD_REQUEST
+                    {"detail": "Some of these slots were just published by another request. Please try again."},
+                    status=status.HTTP_409_CONFLICT
                 )
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
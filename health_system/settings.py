@@ -107,6 +107,16 @@ else:
     STATIC_ROOT = BASE_DIR / 'staticfiles'
     STATIC_URL = '/static/'  # ✅ Add this
 
+# Cache configuration: the default LocMemCache is private to each process,
+# so anything that must agree across replicas needs REDIS_URL
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+
 # Static files configuration
 STATIC_ROOT = '/app/staticfiles' if os.getenv('POSTGRES_HOST') else BASE_DIR / 'staticfiles'
 
@@ -149,7 +159,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework Configuration - CRITICAL FOR YOUR API
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ProfileJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -224,6 +234,8 @@ HEALTHCARE_SETTINGS = {
     'MAX_ADVANCE_BOOKING_DAYS': 90,  # days
     'MIN_ADVANCE_BOOKING_HOURS': 2,  # hours
     'NOTIFICATION_ENABLED': True,
+    # seconds; 0 disables the listing cache, which is only safe to share through Redis
+    'AVAILABLE_APPOINTMENTS_CACHE_TIMEOUT': 60 if os.getenv('REDIS_URL') else 0,
 }
 
 # Logging Configuration
@@ -242,12 +254,12 @@ LOGGING = {
     'loggers': {
         'users': {
             'handlers': ['console'],
-            'level': 'DEBUG',
+            'level': 'DEBUG' if DEBUG else 'INFO',
             'propagate': False,
         },
         'appointments': {
             'handlers': ['console'],
-            'level': 'DEBUG',
+            'level': 'DEBUG' if DEBUG else 'INFO',
             'propagate': False,
         },
     },
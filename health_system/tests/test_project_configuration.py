@@ -1,6 +1,7 @@
 from django.conf import settings
 from django.test import SimpleTestCase
 from django.urls import reverse, resolve
+from django.utils.module_loading import import_string
 
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
@@ -11,7 +12,9 @@ class ProjectConfigurationTests(SimpleTestCase):
 
     def test_rest_framework_authentication_includes_jwt(self):
         configured_classes = settings.REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES']
-        self.assertIn('rest_framework_simplejwt.authentication.JWTAuthentication', configured_classes)
+        self.assertTrue(
+            any(issubclass(import_string(path), JWTAuthentication) for path in configured_classes)
+        )
 
     def test_jwt_token_endpoint_is_registered(self):
         url = reverse('token_obtain_pair')
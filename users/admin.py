@@ -103,6 +103,7 @@ class DoctorAdmin(admin.ModelAdmin):
         'is_available', 'working_schedule'
     )
     list_filter = ('speciality', 'is_available', 'experience', 'created_at')
+    list_select_related = ('user',)
     search_fields = (
         'user__email', 'user__first_name', 'user__last_name',
         'speciality', 'description'
@@ -181,6 +182,7 @@ class PatientAdmin(admin.ModelAdmin):
         'blood_type', 'emergency_contact_name'
     )
     list_filter = ('blood_type', 'city', 'state', 'created_at')
+    list_select_related = ('user',)
     search_fields = (
         'user__email', 'user__first_name', 'user__last_name',
         'identity_id', 'phone', 'emergency_contact_name'
@@ -1,6 +1,7 @@
 import uuid
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
 
@@ -213,6 +214,11 @@ class Doctor(models.Model):
         except (ValueError, TypeError):
             return []
     
+    @cached_property
+    def working_days_set(self):
+        """Working days parsed once per instance for O(1) membership checks."""
+        return frozenset(self.get_working_days_list())
+    
     def clean(self):
         """Validate working_day format"""
         if self.working_day:
@@ -14,9 +14,8 @@ class IsDoctor(permissions.BasePermission):
     Permission to only allow doctors to access the view.
     """
     def has_permission(self, request, view):
-        doctor_profile = request.user.doctor
-        result = request.user.is_authenticated and request.user.role == 'doctor'
-        return result
+        # Views that need the profile read request.user.doctor, which caches it on the user
+        return request.user.is_authenticated and request.user.role == 'doctor'
 
 
 class IsSelf(permissions.BasePermission):